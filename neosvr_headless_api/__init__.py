@@ -24,14 +24,20 @@ get started in the right direction.
 from __future__ import annotations
 from typing import Union
 
-from threading import Thread, Event
-from queue import Queue, Empty
+from threading import Thread, Event, Lock
+from queue import SimpleQueue, Empty
+from collections import deque
 from subprocess import Popen, PIPE
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from selectors import DefaultSelector, EVENT_READ
+from functools import wraps, lru_cache
+from time import monotonic
 from os import path
+import os
+import sys
 
-from parse import parse, findall
-
+from .parsers import parse_worlds, parse_status, parse_users, parse_bans
 from .response_formats import *
 
 # Constants for "role" command
@@ -52,6 +58,70 @@ ANYONE = "Anyone"
 # Maximum time to wait for RPC responses (in seconds)
 SYNC_REQUEST_TIMEOUT = 60
 
+# Startup messages that contain a comma-separated list.
+_STARTUP_LIST_ATTRS = frozenset(
+    ("supported_texture_formats", "available_locales", "supported_network_protocols")
+)
+
+# Thread pool shared by all headless clients for running `async_()` calls.
+# Commands are still run one at a time per client, but other work submitted
+# alongside them doesn't have to wait for its turn. Functions that send
+# commands hold a worker for as long as they wait for the client, so with many
+# busy clients they can use up the pool. `send_command_async()` has its own
+# thread per client for that reason.
+_ASYNC_POOL = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) + 4),
+    thread_name_prefix="neosvr-headless-api-async",
+)
+
+# Error messages that can be printed in response to some commands.
+_FOCUS_ERRORS = frozenset(
+    ("World with this name does not exist", "World index out of range")
+)
+_LOGIN_ERRORS = frozenset(("Invalid credentials", "Already logged in!"))
+_FRIEND_ERRORS = frozenset(("No friend with this username", "Not logged in!"))
+_FRIEND_REQUEST_ERRORS = frozenset(
+    ("There's no friend request from this user", "No friend with this username")
+)
+_BAN_ERRORS = frozenset(("User not found", "Already banned"))
+
+# Commands that only read state. Their output can be shared by callers waiting
+# on the same command, and reused for `HeadlessClient.cache_ttl` seconds. Any
+# other command clears the cache once it has run.
+_CACHED_COMMANDS = frozenset(("worlds", "status", "users", "sessionurl", "sessionid"))
+
+
+def _cached(func):
+    """
+    Reuse the return value of `func` for `cache_ttl` seconds when it is called
+    again for the same world. `func` must take no arguments other than an
+    optional `world`.
+    """
+
+    @wraps(func)
+    def wrapper(self, world=None):
+        if not self.cache_ttl:
+            return func(self, world) if world is not None else func(self)
+        key = (func.__name__, world)
+        now = monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and now - cached[0] < self.cache_ttl:
+            return cached[1]
+        # If the cache is invalidated while `func` is running, its result may
+        # predate the change, so it isn't stored. Without a world, the result
+        # also depends on which world is focused.
+        generation = self._cache_generation
+        focus_generation = self._focus_generation
+        result = func(self, world) if world is not None else func(self)
+        with self._cache_lock:
+            if generation == self._cache_generation and (
+                world is not None or focus_generation == self._focus_generation
+            ):
+                self._cache[key] = (now, result)
+        return result
+
+    return wrapper
+
 
 class HeadlessClient:
     """
@@ -79,8 +149,39 @@ class HeadlessClient:
         # may not necessarily be the same as what was provided for
         # the `config` keyword.
         self.config = self.process.config
-        self.command_queue = Queue()
+        # Held while a command is being run, so that only one command talks to
+        # the headless client at a time.
+        self._command_lock = Lock()
+        # The world that the last successful focus switched to, if it can still
+        # be relied on. Only focus changes made through this class are seen, so
+        # it's reset after anything that could have changed it.
+        self._current_focus = None
+        # Read-only commands that are still waiting for `_command_lock`, so
+        # identical requests made in the meantime can share their output.
+        self._pending = {}
+        self._pending_lock = Lock()
         self.ready = Event()
+        # Resolved once startup has either finished or failed, so that waiting
+        # callers can tell the two apart.
+        self._startup_result = Future()
+
+        self.cache_ttl = 0
+        """
+        Number of seconds that the results of `worlds()`, `status()`,
+        `users()`, `session_url()` and `session_id()` are reused for before the
+        headless client is asked again. `0` (the default) disables caching.
+        Running any other command clears the cache, and switching to another
+        world drops the results that were cached without a `world`. Cached
+        results are shared between callers, so they shouldn't be modified.
+        """
+        self._cache = {}
+        # Incremented whenever the cache is cleared, or the focused world
+        # changes, respectively. See `_cached()`.
+        self._cache_generation = 0
+        self._focus_generation = 0
+        # Held while checking those before storing a result, and while changing
+        # them, so that a result can't be stored just after the cache is cleared.
+        self._cache_lock = Lock()
 
         self.version = None
         self.supported_texture_formats = None
@@ -90,137 +191,120 @@ class HeadlessClient:
         self.machine_id = None
         self.supported_network_protocols = None
 
-        def init():
-            """Parse startup messages and determine when it's ready."""
-            # `almost_ready` is set to True when at least one world is
-            # running. Only then do we look for the ">" character in the
-            # prompt, to prevent false positives.
-            almost_ready = False
-            while True:
-                # If the timeout is hit, assume that startup has halted due to
-                # some sort of error, ex. network issues or incorrect Neos
-                # password. Don't bother collecting other startup info, and
-                # never mark the headless client as ready.
-                try:
-                    ln = self.process.readline(timeout=30)
-                except CommandTimeout:
-                    break
-                self._check_startup_line(ln)
-                if ln.endswith(">") and almost_ready:
-                    self.ready.set()
-                    break
-                elif ln == "World running...":
-                    almost_ready = True
-
-        init_thread = Thread(target=init)
-        init_thread.start()
-
-        self._command_thread = Thread(target=self._command_processor)
-        self._command_thread.daemon = True
-        self._command_thread.start()
-
-        # TODO: Implement proper shutdown.
-        self._async_thread = ThreadPoolExecutor(max_workers=1)
+        self._startup_thread = Thread(target=self._startup)
+        self._startup_thread.daemon = True
+        self._startup_thread.start()
+
+        self._async_pool = _ASYNC_POOL
+        # Commands sent by `send_command_async()` mostly wait on the command
+        # lock, so they get a worker of their own instead of tying up the
+        # shared pool. They can only run one at a time anyway.
+        self._command_pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="neosvr-headless-api-command"
+        )
 
     def _check_startup_line(self, ln):
         """Extracts info from startup messages."""
-        fmt = parse(NEOS_VERSION_FORMAT, ln)
-        if fmt:
-            self.version = fmt[0]
-            return
-        fmt = parse(SUPPORTED_TEXTURE_FORMATS_FORMAT, ln)
-        if fmt:
-            self.supported_texture_formats = fmt[0].split(", ")
-            return
-        fmt = parse(AVAILABLE_LOCALES_FORMAT, ln)
-        if fmt:
-            self.available_locales = fmt[0].split(", ")
-            return
-        fmt = parse(ARGUMENT_FORMAT, ln)
-        if fmt:
-            self.argument = fmt[0]
-            return
-        fmt = parse(COMPATIBILITY_HASH_FORMAT, ln)
-        if fmt:
-            self.compatibility_hash = fmt[0]
-            return
-        fmt = parse(MACHINE_ID_FORMAT, ln)
-        if fmt:
-            self.machine_id = fmt[0]
+        match = STARTUP_REGEX.fullmatch(ln)
+        if match is None:
             return
-        fmt = parse(SUPPORTED_NETWORK_PROTOCOLS_FORMAT, ln)
-        if fmt:
-            self.supported_network_protocols = fmt[0].split(", ")
-            return
-
-    def _command_processor(self):
-        """Dedicated thread for processing command queue."""
+        attr = match.lastgroup
+        value = match[attr]
+        setattr(self, attr, value.split(", ") if attr in _STARTUP_LIST_ATTRS else value)
+
+    def _startup(self):
+        """Parse startup messages and determine when it's ready."""
+        # `almost_ready` is set to True when at least one world is running.
+        # Only then do we look for the ">" character in the prompt, to prevent
+        # false positives.
+        almost_ready = False
+        # Looked up once, as every attribute access on a remote process is a
+        # round trip to the RPC server.
+        readline = self.process.readline
         while True:
-            hcmd = self.command_queue.get()
-
-            # If a world is specified, try to focus it. If it doesn't exist,
-            # pass along an exception and don't execute the next command.
-
-            execute_command = True
-
-            if hcmd.world != None:
-                if isinstance(hcmd.world, int):
-                    self.process.write("focus %d\n" % hcmd.world)
-                else:
-                    self.process.write('focus "%s"\n' % hcmd.world)
-
-                errors = [
-                    "World with this name does not exist",
-                    "World index out of range",
-                ]
-
-                while True:
-                    try:
-                        ln = self.process.readline(timeout=30)
-                    except CommandTimeout as e:
-                        # Recreate the exception to avoid rpyc proxying issues.
-                        hcmd.set_result(CommandTimeout(e.args[0]))
-                        execute_command = False
-                        break
-                    if ln in errors:
-                        # Pass the exception, caller is responsible for raising.
-                        hcmd.set_result(NeosError(ln))
-                        # Signal to skip the remainder of the parent loop.
-                        execute_command = False
-                    elif ln.endswith(">"):
-                        break
-
-            # If a world to focus was specified and focusing that world failed,
-            # the command intended to be run after it should not be executed.
-
-            if not execute_command:
-                self.command_queue.task_done()
-                continue
-
-            # Execute the actual command here.
-
-            command_timeout = False
-
-            self.process.write("%s\n" % hcmd.cmd)
-            res = []
-            while True:
-                try:
-                    ln = self.process.readline(timeout=30)
-                except CommandTimeout as e:
-                    # Recreate the exception to avoid rpyc proxying issues.
-                    hcmd.set_result(CommandTimeout(e.args[0]))
-                    command_timeout = True
-                    break
-                if ln.endswith(">"):
-                    break
-                res.append(ln)
-
-            if command_timeout:
-                self.command_queue.task_done()
-                continue
+            # If the timeout is hit, assume that startup has halted due to some
+            # sort of error, ex. network issues or incorrect Neos password.
+            # Don't bother collecting other startup info, and never mark the
+            # headless client as ready.
+            try:
+                ln = readline(timeout=30)
+            except CommandTimeout:
+                self._startup_result.set_exception(
+                    HeadlessNotReady("The headless client failed to start up.")
+                )
+                break
+            self._check_startup_line(ln)
+            if ln.endswith(">") and almost_ready:
+                self.ready.set()
+                self._startup_result.set_result(True)
+                break
+            elif ln == "World running...":
+                almost_ready = True
+
+    def _run_command(self, hcmd):
+        """
+        Run a `HeadlessCommand` and set its result. Must only be called while
+        holding `_command_lock`.
+        """
+        # If a world is specified, try to focus it. If it doesn't exist, pass
+        # along an exception and don't execute the command. There's no need to
+        # do this if that world is already focused.
+        if hcmd.world != None and hcmd.world != self._current_focus:
+            # Only set again once the focus has succeeded, so that a failed or
+            # timed out focus is always retried by the next command.
+            self._current_focus = None
+            if isinstance(hcmd.world, int):
+                focus = f"focus {hcmd.world}"
+            else:
+                focus = f'focus "{hcmd.world}"'
 
-            hcmd.set_result(res)
-            self.command_queue.task_done()
+            try:
+                lines = self.process.run_command(focus, timeout=30)
+            except CommandTimeout as e:
+                # Recreate the exception to avoid rpyc proxying issues.
+                hcmd.set_result(CommandTimeout(e.args[0]))
+                return
+            for ln in lines:
+                if ln in _FOCUS_ERRORS:
+                    # Pass the exception, caller is responsible for raising.
+                    hcmd.set_result(NeosError(ln))
+                    return
+            self._current_focus = hcmd.world
+            # Cached results for no particular world were for whichever world
+            # was focused before.
+            with self._cache_lock:
+                self._focus_generation += 1
+                for key in list(self._cache):
+                    if key[1] is None:
+                        del self._cache[key]
+
+        # Execute the actual command here.
+        try:
+            res = self.process.run_command(hcmd.cmd, timeout=30)
+        except CommandTimeout as e:
+            # The headless client might still be running the command, so
+            # whichever world it ends up focused on can't be relied on.
+            self._current_focus = None
+            # Recreate the exception to avoid rpyc proxying issues.
+            hcmd.set_result(CommandTimeout(e.args[0]))
+            return
+        except BaseException:
+            self._current_focus = None
+            raise
+        finally:
+            # Anything other than a read-only command might change which world
+            # is focused, or what world an index refers to. Only clear the cache
+            # once the command has run, so that nothing read before it can be
+            # stored again afterwards.
+            if hcmd.cmd not in _CACHED_COMMANDS:
+                self._current_focus = None
+                with self._cache_lock:
+                    self._cache_generation += 1
+                    self._cache.clear()
+
+        # The output arrives as a `tuple` so that it can be copied from a
+        # remote process in one go, rather than fetched item by item.
+        hcmd.set_result(list(res))
 
     def is_ready(self) -> bool:
         """
@@ -234,8 +318,13 @@ class HeadlessClient:
         Block until the headless client is ready to accept commands. Returns
         `True` when ready. If `timeout` is specified and the headless client
         takes longer than `timeout` seconds to become ready, returns `False`.
+        If startup stalls and the headless client will never become ready,
+        raises `HeadlessNotReady`.
         """
-        return self.ready.wait(timeout=timeout)
+        try:
+            return self._startup_result.result(timeout=timeout)
+        except FutureTimeout:
+            return False
 
     def wait_for_shutdown(self, timeout: int = None) -> int:
         """
@@ -278,19 +367,95 @@ class HeadlessClient:
         Sends a command to the console, returns the output as a `list`. Each
         item of the `list` is a single line of command output, exactly as returned
         by the headless client. You can use this method to run commands that
-        haven't been added to the API yet.
+        haven't been added to the API yet. Raises `ValueError` if `cmd`, or
+        `world` when it's a world name, contains a line break.
+
+        If the headless client has exited, the `OSError` from writing to it
+        (usually `BrokenPipeError`) is raised. For a `RemoteHeadlessClient`, an
+        `EOFError` is raised if the connection to the RPC server is lost.
+        """
+        return self.send_commands([cmd], world=world)[0]
+
+    def send_commands(self, cmds: list[str], world: Union[str, int] = None) -> list:
+        """
+        Sends several commands to the console at once and returns a `list`
+        containing the output of each command in the same order, as it would
+        be returned by `send_command()`. All of the commands are run together,
+        so they run back to back without other callers' commands in between.
+        If any of them fail, the first exception is raised once all of them
+        have finished.
+
+        If every command only reads state (such as "status" or "worlds"), the
+        ones that are identical to a command for the same world that is
+        already waiting to run are not run again. Both callers are given the
+        same output instead. Commands given together are never shared with
+        each other, and commands are never shared with a call that also
+        changes state.
         """
         if not self.is_ready():
             raise HeadlessNotReady("The headless client is still starting up.")
-        hcmd = HeadlessCommand(cmd, world=world)
-        self.command_queue.put(hcmd)
-        # This will block until it is this command's turn in the queue, and it
-        # will return the result as soon as it is available.
+        for cmd in cmds:
+            # The console reads one command per line, so a line break in an
+            # argument would run whatever follows it as another command.
+            if "\n" in cmd or "\r" in cmd:
+                raise ValueError("Commands can't contain line breaks: %r" % cmd)
+        # The same goes for a world name, which is sent in a "focus" command.
+        if isinstance(world, str) and ("\n" in world or "\r" in world):
+            raise ValueError("World names can't contain line breaks: %r" % world)
+        hcmds = []
+        to_run = []
+        # Sharing output with other callers would let it come from before or
+        # after the other commands given here, so it's only done when there are
+        # no commands that change state.
+        shared = _CACHED_COMMANDS.issuperset(cmds)
+        with self._pending_lock:
+            for cmd in cmds:
+                hcmd = self._pending.get((cmd, world)) if shared else None
+                if hcmd is None or hcmd in to_run:
+                    hcmd = HeadlessCommand(cmd, world=world)
+                    if shared:
+                        self._pending[(cmd, world)] = hcmd
+                    to_run.append(hcmd)
+                hcmds.append(hcmd)
+        if to_run:
+            with self._command_lock:
+                # Once the commands have started, they can't be shared by later
+                # callers anymore, since they might want output newer than this.
+                with self._pending_lock:
+                    for hcmd in to_run:
+                        if self._pending.get((hcmd.cmd, hcmd.world)) is hcmd:
+                            del self._pending[(hcmd.cmd, hcmd.world)]
+                try:
+                    for hcmd in to_run:
+                        self._run_command(hcmd)
+                except BaseException as e:
+                    # Other callers may be waiting on these commands, so give
+                    # every one that hasn't finished the same exception instead
+                    # of leaving them blocked forever.
+                    for hcmd in to_run:
+                        if not hcmd.done():
+                            hcmd.set_result(e)
+                    raise
+        # Commands shared with other callers are run by whoever created them,
+        # so this may still block until their output is available.
         # See the `HeadlessCommand` class for more info.
-        result = hcmd.result()
-        if isinstance(result, (NeosError, CommandTimeout)):
-            raise result
-        return result
+        results = [hcmd.result() for hcmd in hcmds]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        # The same output may have been handed to other callers, so each one
+        # gets a copy of its own to modify.
+        return [list(result) for result in results]
+
+    def send_command_async(self, cmd: str, world: Union[str, int] = None) -> Future:
+        """
+        Like `send_command()`, but returns immediately with a `Future` from
+        `concurrent.futures` that resolves to the output of the command. This
+        lets several commands be sent without waiting for each one to finish,
+        so their output can be processed as soon as it arrives. The commands
+        themselves are still run one at a time, in the order they were sent.
+        """
+        return self._command_pool.submit(self.send_command, cmd, world=world)
 
     def async_(self, func, *args, **kwargs):
         """
@@ -298,8 +463,16 @@ class HeadlessClient:
         you want to execute as well as any required `args` or `kwargs`. This
         returns a `Future` object from `concurrent.futures`. See Python's
         documentation for information on how to use it.
+
+        Functions passed to `async_()` may run at the same time as each other,
+        so they aren't guaranteed to finish in the order they were submitted.
+        Use `send_commands()` if several commands must run in a fixed order.
+
+        The thread pool is shared by every headless client, and a function
+        holds one of its threads while it waits for its commands to run. Use
+        `send_command_async()` to send many commands to a busy client.
         """
-        fut = self._async_thread.submit(func, *args, **kwargs)
+        fut = self._async_pool.submit(func, *args, **kwargs)
         return fut
 
     # BEGIN HEADLESS CLIENT COMMANDS
@@ -319,12 +492,11 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the login failed.
         """
-        cmd = self.send_command('login "%s" "%s"' % (username_or_email, password))
-        errors = ["Invalid credentials", "Already logged in!"]
+        cmd = self.send_command(f'login "{username_or_email}" "{password}"')
         for ln in cmd:
             if ln == "Logged in successfully!":
                 return ln
-            elif ln in errors:
+            elif ln in _LOGIN_ERRORS:
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
@@ -348,12 +520,11 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if there was a problem.
         """
-        cmd = self.send_command('message "%s" "%s"' % (friend_name, message))
-        errors = ["No friend with this username", "Not logged in!"]
+        cmd = self.send_command(f'message "{friend_name}" "{message}"')
         for ln in cmd:
             if ln == "Message sent!":
                 return ln
-            elif ln in errors:
+            elif ln in _FRIEND_ERRORS:
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
@@ -365,12 +536,11 @@ class HeadlessClient:
 
         Returns the success message or raises `NeosError` if there was a problem.
         """
-        cmd = self.send_command('invite "%s"' % friend_name, world=world)
-        errors = ["No friend with this username", "Not logged in!"]
+        cmd = self.send_command(f'invite "{friend_name}"', world=world)
         for ln in cmd:
             if ln == "Invite sent!":
                 return ln
-            elif ln in errors:
+            elif ln in _FRIEND_ERRORS:
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
@@ -391,18 +561,15 @@ class HeadlessClient:
         Raise `NeosError` if no friend request has been found from this user
         Raise `UnhandledError` for any unkown error
         """
-        cmd = self.send_command('acceptFriendRequest %s' % username)
-        errors = [
-            "There's no friend request from this user",
-            "No friend with this username",
-        ]
+        cmd = self.send_command(f"acceptFriendRequest {username}")
         for ln in cmd:
             if ln == 'Request accepted!':
                 return
-            elif ln in errors:
+            elif ln in _FRIEND_REQUEST_ERRORS:
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
+    @_cached
     def worlds(self) -> list[dict]:
         """
         Lists all active worlds. Returns a `list` of `dict`.
@@ -421,17 +588,7 @@ class HeadlessClient:
           - The maximum number of users allowed to connect
         """
         cmd = self.send_command("worlds")
-
-        # World names can contain newline characters, so we have to put the
-        # whole command output back together and examine the whole thing.
-        cmd = "\n".join(cmd)
-        worlds = []
-        for world in findall(WORLD_FORMAT, cmd):
-            world = world.named
-            world["name"] = world["name"].rstrip()
-            worlds.append(world)
-
-        return worlds
+        return parse_worlds(cmd)
 
     def focus(self, world_name_or_number: Union[str, int]):
         """
@@ -442,12 +599,11 @@ class HeadlessClient:
         # This command prints nothing on a successful switch.
         try:
             world_number = int(world_name_or_number)
-            cmd = self.send_command("focus %d" % world_number)
+            cmd = self.send_command(f"focus {world_number}")
         except ValueError:
-            cmd = self.send_command('focus "%s"' % world_name_or_number)
-        errors = ["World index out of range", "World with this name does not exist"]
+            cmd = self.send_command(f'focus "{world_name_or_number}"')
         for ln in cmd:
-            if ln in errors:
+            if ln in _FOCUS_ERRORS:
                 raise NeosError(ln)
 
     def start_world_url(self, world_url: str):
@@ -462,7 +618,7 @@ class HeadlessClient:
         """
         if not world_url.startswith('neosrec://'):
             raise NeosError('Invalid neos record format')
-        cmd = self.send_command('startWorldURL  "%s"' % (world_url))
+        cmd = self.send_command(f'startWorldURL  "{world_url}"')
         if "World running..." in cmd:
             return
         elif len(cmd) == 1 and "Resolving SessionID: " in cmd:
@@ -480,15 +636,15 @@ class HeadlessClient:
         Raise `NeosError` if the world template name is invalid
         Raise `UnhandledError` for any unknown errors
         """
-        cmd = self.send_command('startWorldTemplate  "%s"' % (world_template))
-        errors = ['Invalid preset name']
+        cmd = self.send_command(f'startWorldTemplate  "{world_template}"')
         for ln in cmd:
             if ln == "World running...":
                 return
-            elif ln in errors:
+            elif ln == "Invalid preset name":
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
+    @_cached
     def status(self, world: Union[str, int] = None) -> dict:
         """
         Shows the status of the current world, or `world` if it is specified.
@@ -524,82 +680,12 @@ class HeadlessClient:
           - A list of usernames connected to the session (**without** the `U-` prefix)
         """
         cmd = self.send_command("status", world=world)
-
-        format_status_mapping = [
-            (STATUS_SESSION_ID_FORMAT, "session_id"),
-            (STATUS_CURRENT_USERS_FORMAT, "current_users"),
-            (STATUS_PRESENT_USERS_FORMAT, "present_users"),
-            (STATUS_MAX_USERS_FORMAT, "max_users"),
-            (STATUS_UPTIME_FORMAT, "uptime"),
-            (STATUS_ACCESS_LEVEL_FORMAT, "access_level"),
-            (STATUS_HIDDEN_FROM_LISTING_FORMAT, "hidden_from_listing"),
-            (STATUS_MOBILE_FRIENDLY_FORMAT, "mobile_friendly"),
-            (STATUS_USERS_FORMAT, "users"),
-        ]
-
-        status = {}
-        for ln in cmd:
-            # Parse the world name. This should catch almost any name: Normal
-            # world names, world names with XML formatting, world names that are
-            # multiple lines, and even world names that are blank.
-            # Known bug: World names with any line ending with a ">" character
-            # should be avoided, as this interferes with prompt detection.
-            if ln.startswith("Name: "):
-                name = ln.split(": ")[1]
-                # Set name to `None` if the world name is empty.
-                if name == "":
-                    status["name"] = None
-                    continue
-                # Ignore any errors that may have been printed to the console by
-                # finding out what line the world name is on, and cutting off
-                # everything else before it. This is a Neos bug.
-                # See: https://github.com/Neos-Metaverse/NeosPublic/issues/2436
-                name_index = cmd.index(ln)
-                # Put everything back together, to catch multi-line names.
-                trimmed_cmd = "\n".join(cmd[name_index:])
-                # Finally, pull out the world name.
-                status["name"] = parse(STATUS_NAME_FORMAT, trimmed_cmd)[0]
-
-            # Parse everything else, except for the if-statements below this.
-            for i, j in format_status_mapping:
-                fmt = parse(i, ln)
-                if fmt:
-                    status[j] = fmt[0]
-                    break
-
-            # Parse the description. It could be empty, or could be multi-line.
-            if ln.startswith("Description: "):
-                description = ln.split(": ")[1]
-                # Set description to `None` if the description is empty.
-                if description == "":
-                    status["description"] = None
-                    continue
-                # Remove all lines before the description, so that it lines up
-                # with the parsing string.
-                description_index = cmd.index(ln)
-                trimmed_cmd = "\n".join(cmd[description_index:])
-                status["description"] = parse(STATUS_DESCRIPTION_FORMAT, trimmed_cmd)[0]
-
-            # Parse tags. It could be empty, or a comma-delimited list.
-            if ln.startswith("Tags: "):
-                tags = ln.split(": ")[1]
-                if tags == "":  # No tags
-                    status["tags"] = []
-                    continue
-                status["tags"] = parse(STATUS_TAGS_FORMAT, ln)[0].split(", ")
-
-        # Finally, some type conversions.
-
-        status["hidden_from_listing"] = (
-            True if status["hidden_from_listing"] == "True" else False
-        )
-        status["mobile_friendly"] = (
-            True if status["mobile_friendly"] == "True" else False
-        )
-        status["users"] = status["users"].split(", ")
-
+        status = parse_status(cmd)
+        if status is None:
+            raise UnhandledError("\n".join(cmd))
         return status
 
+    @_cached
     def session_url(self, world: Union[str, int] = None) -> str:
         """
         Returns the URL of the current session or specified `world`.
@@ -612,6 +698,7 @@ class HeadlessClient:
                 return ln
         raise UnhandledError("\n".join(cmd))
 
+    @_cached
     def session_id(self, world: Union[str, int] = None) -> str:
         """
         Returns the ID of the current session or specified `world`.
@@ -627,6 +714,7 @@ class HeadlessClient:
     # `copySessionURL` is not supported.
     # `copySessionID` is not supported.
 
+    @_cached
     def users(self, world: Union[str, int] = None) -> list[dict]:
         """
         Lists all users in the current world, or `world` if specified.
@@ -655,27 +743,7 @@ class HeadlessClient:
         """
         cmd = self.send_command("users", world=world)
 
-        users = []
-        for ln in cmd:
-            user = parse(USER_FORMAT, ln)
-            if user == None:  # Invalid output
-                continue
-            user = user.named
-            # Check if a user has a user ID and set it to `None` if they don't.
-            # This should only happen for the headless user if it is not logged
-            # into a Neos account.
-            user_id = user["user_id"].lstrip()
-            if user_id == "":
-                user["user_id"] = None
-            else:
-                user["user_id"] = user_id
-            user["present"] = True if user["present"] == "True" else False
-            if user["fps"].is_integer():
-                user["fps"] = int(user["fps"])
-            user["silenced"] = True if user["silenced"] == "True" else False
-            users.append(user)
-
-        return users
+        return parse_users(cmd)
 
     def close(self, world: Union[str, int] = None):
         """
@@ -726,7 +794,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('kick "%s"' % username, world=world)
+        cmd = self.send_command(f'kick "{username}"', world=world)
         for ln in cmd:
             if ln.endswith("kicked!"):
                 return ln
@@ -741,7 +809,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('silence "%s"' % username, world=world)
+        cmd = self.send_command(f'silence "{username}"', world=world)
         for ln in cmd:
             if ln.endswith("silenced!"):
                 return ln
@@ -756,7 +824,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('unsilence "%s"' % username, world=world)
+        cmd = self.send_command(f'unsilence "{username}"', world=world)
         for ln in cmd:
             if ln.endswith("unsilenced!"):
                 return ln
@@ -772,7 +840,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('ban "%s"' % username, world=world)
+        cmd = self.send_command(f'ban "{username}"', world=world)
         for ln in cmd:
             if ln.endswith("banned!"):
                 return ln
@@ -786,7 +854,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('unban "%s"' % username)
+        cmd = self.send_command(f'unban "{username}"')
         for ln in cmd:
             if ln == "Ban removed!":
                 return ln
@@ -809,13 +877,7 @@ class HeadlessClient:
           - This value may be "N/A" if the machine ID was not known at the time of the ban.
         """
         cmd = self.send_command("listbans")
-        bans = []
-        for ln in cmd:
-            banned = parse(BAN_FORMAT, ln)
-            if banned == None:  # Invalid output
-                continue
-            bans.append(banned.named)
-        return bans
+        return parse_bans(cmd)
 
     def ban_by_name(self, neos_username: str) -> str:
         """
@@ -823,12 +885,11 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if there was a problem.
         """
-        cmd = self.send_command('banbyname "%s"' % neos_username)
-        errors = ["User not found", "Already banned"]
+        cmd = self.send_command(f'banbyname "{neos_username}"')
         for ln in cmd:
             if ln == "User banned":
                 return ln
-            elif ln in errors:
+            elif ln in _BAN_ERRORS:
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
@@ -838,7 +899,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('unbanbyname "%s"' % neos_username)
+        cmd = self.send_command(f'unbanbyname "{neos_username}"')
         for ln in cmd:
             if ln == "Ban removed":
                 return ln
@@ -852,12 +913,11 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if there was a problem.
         """
-        cmd = self.send_command('banbyid "%s"' % user_id)
-        errors = ["User not found", "Already banned"]
+        cmd = self.send_command(f'banbyid "{user_id}"')
         for ln in cmd:
             if ln == "User banned":
                 return ln
-            elif ln in errors:
+            elif ln in _BAN_ERRORS:
                 raise NeosError(ln)
         raise UnhandledError("\n".join(cmd))
 
@@ -867,7 +927,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('unbanbyid "%s"' % user_id)
+        cmd = self.send_command(f'unbanbyid "{user_id}"')
         for ln in cmd:
             if ln == "Ban removed":
                 return ln
@@ -882,7 +942,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user wasn't found.
         """
-        cmd = self.send_command('respawn "%s"' % username, world=world)
+        cmd = self.send_command(f'respawn "{username}"', world=world)
         for ln in cmd:
             if ln.endswith("respawned!"):
                 return ln
@@ -897,7 +957,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the user or role wasn't found.
         """
-        cmd = self.send_command('role "%s" "%s"' % (username, role), world=world)
+        cmd = self.send_command(f'role "{username}" "{role}"', world=world)
         for ln in cmd:
             if " now has role " in ln and ln.endswith("!"):
                 return ln
@@ -915,7 +975,7 @@ class HeadlessClient:
         Returns nothing on success.
         """
         # Command prints nothing on success. Nothing to return.
-        self.send_command('name "%s"' % new_name, world=world)
+        self.send_command(f'name "{new_name}"', world=world)
 
     def access_level(
         self, access_level_name: str, world: Union[str, int] = None
@@ -926,7 +986,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` is the access level is invalid.
         """
-        cmd = self.send_command('accesslevel "%s"' % access_level_name, world=world)
+        cmd = self.send_command(f'accesslevel "{access_level_name}"', world=world)
         for ln in cmd:
             if ln.startswith("World ") and " now has access level " in ln:
                 return ln
@@ -942,7 +1002,7 @@ class HeadlessClient:
         Returns the success message, or raises `NeosError` if a non-boolean value is given.
         """
         cmd = self.send_command(
-            'hidefromlisting "%s"' % str(true_false).lower(), world=world
+            f'hidefromlisting "{str(true_false).lower()}"', world=world
         )
         for ln in cmd:
             if ln.endswith("listing") and (
@@ -961,7 +1021,7 @@ class HeadlessClient:
         Returns nothing on success.
         """
         # Command prints nothing on success. Nothing to return.
-        self.send_command('description "%s"' % new_description, world=world)
+        self.send_command(f'description "{new_description}"', world=world)
 
     def max_users(self, max_users: int, world: Union[str, int] = None):
         """
@@ -971,7 +1031,7 @@ class HeadlessClient:
         Returns nothing on success, but raises `NeosError` if the number is out of range.
         """
         # Nothing printed on command success.
-        cmd = self.send_command('maxusers "%s"' % max_users, world=world)
+        cmd = self.send_command(f'maxusers "{max_users}"', world=world)
         for ln in cmd:
             if ln == "Invalid number. Must be within 1 and 256":
                 raise NeosError(ln)
@@ -987,7 +1047,7 @@ class HeadlessClient:
         """
         # Nothing printed on command success.
         cmd = self.send_command(
-            'awaykickinterval "%s"' % interval_in_minutes, world=world
+            f'awaykickinterval "{interval_in_minutes}"', world=world
         )
         for ln in cmd:
             if ln == "Invalid number":
@@ -1079,7 +1139,7 @@ class HeadlessClient:
 
         Returns the success message, or raises `NeosError` if the number is invalid.
         """
-        cmd = self.send_command('tickrate "%s"' % ticks_per_second)
+        cmd = self.send_command(f'tickrate "{ticks_per_second}"')
         for ln in cmd:
             if ln == "Tick Rate Set!":
                 return ln
@@ -1150,6 +1210,20 @@ class LocalHeadlessClient(HeadlessClient):
         return self.process.kill(timeout=timeout, wait=wait)
 
 
+@lru_cache(maxsize=None)
+def _rpyc_connect():
+    """
+    Set up `rpyc` the first time a `RemoteHeadlessClient` is created, and
+    return its `connect()` function.
+    """
+    # This import is here to effectively make `rpyc` an optional dependency.
+    from rpyc import connect, core
+
+    _gec = core.vinegar._generic_exceptions_cache
+    _gec["neosvr_headless_api.CommandTimeout"] = CommandTimeout
+    return connect
+
+
 class RemoteHeadlessClient(HeadlessClient):
     """
     Start a headless client on a remote machine, by connecting to an RPC server
@@ -1160,11 +1234,7 @@ class RemoteHeadlessClient(HeadlessClient):
     """
 
     def __init__(self, host: str, port: int, neos_dir: str, config: str = None):
-        # This import is here to effectively make `rpyc` an optional dependency.
-        from rpyc import connect, core
-
-        _gec = core.vinegar._generic_exceptions_cache
-        _gec["neosvr_headless_api.CommandTimeout"] = CommandTimeout
+        connect = _rpyc_connect()
         self.host, self.port = host, port
         self.connection = connect(
             host, port, config={"sync_request_timeout": SYNC_REQUEST_TIMEOUT}
@@ -1174,27 +1244,118 @@ class RemoteHeadlessClient(HeadlessClient):
         )
         super().__init__(neos_dir, config)
 
-    def shutdown(self) -> int:
-        """Shut down the headless client."""
-        return self.connection.root.stop_headless_process(self.remote_pid)
+    def _call_remote(self, func, *args, wait=True):
+        """
+        Call `func` on the RPC server with `args`. If `wait` is `False`, send
+        the request without waiting for a reply and return `None`.
+        """
+        if wait:
+            return func(*args)
+        # Imported here for the same reason as in `_rpyc_connect()`.
+        from rpyc import async_
+
+        async_(func)(*args)
 
-    def sigint(self) -> int:
+    def shutdown(self, wait: bool = True) -> int:
+        """
+        Shut down the headless client. If `wait` is `True`, block until it
+        exits and return the exit code. Otherwise return immediately, which
+        lets several remote headless clients be shut down at the same time.
+        """
+        return self._call_remote(
+            self.connection.root.stop_headless_process, self.remote_pid, wait=wait
+        )
+
+    def sigint(self, wait: bool = True) -> int:
         """
         Send a SIGINT to the headless client, same as pressing Ctrl+C.
+        If `wait` is `True`, block until it exits and return the exit code.
         """
-        return self.connection.root.send_signal_headless_process(self.remote_pid, 2)
+        return self._call_remote(
+            self.connection.root.send_signal_headless_process,
+            self.remote_pid,
+            2,
+            wait=wait,
+        )
 
-    def terminate(self) -> int:
+    def terminate(self, wait: bool = True) -> int:
         """
         Send a SIGTERM to the headless client, politely asking it to close.
+        If `wait` is `True`, block until it exits and return the exit code.
         """
-        return self.connection.root.send_signal_headless_process(self.remote_pid, 15)
+        return self._call_remote(
+            self.connection.root.send_signal_headless_process,
+            self.remote_pid,
+            15,
+            wait=wait,
+        )
 
-    def kill(self) -> int:
+    def kill(self, wait: bool = True) -> int:
         """
         Send a SIGKILL to the headless client, immediately force closing it.
+        If `wait` is `True`, block until it exits and return the exit code.
         """
-        return self.connection.root.send_signal_headless_process(self.remote_pid, 9)
+        return self._call_remote(
+            self.connection.root.send_signal_headless_process,
+            self.remote_pid,
+            9,
+            wait=wait,
+        )
+
+
+class _PipeSelector:
+    """
+    Reads from the stdout and stderr pipes of any number of `HeadlessProcess`
+    instances on one thread. Not used on Windows.
+    """
+
+    def __init__(self):
+        self._selector = DefaultSelector()
+        # Written to whenever a pipe is registered, to wake up the thread so
+        # that it starts watching it. Not every kind of selector picks up new
+        # registrations while it is already waiting.
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._selector.register(self._wakeup_r, EVENT_READ)
+        self._thread = Thread(target=self._run, name="neosvr-headless-api-pipes")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def register(self, pipe, handler):
+        """
+        Call `handler` with whatever is read from `pipe`, and once more with
+        nothing when it is closed.
+        """
+        # Each pipe is read into its own preallocated buffer, instead of
+        # allocating a new `bytes` object for every read.
+        self._selector.register(
+            pipe, EVENT_READ, (handler, memoryview(bytearray(65536)))
+        )
+        os.write(self._wakeup_w, b"\0")
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    os.read(self._wakeup_r, 512)
+                    continue
+                handler, buffer = key.data
+                # The pipe is readable, so this reads whatever is available (up
+                # to the size of the buffer) without blocking.
+                try:
+                    size = key.fileobj.readinto(buffer)
+                except OSError:
+                    # Treat a broken pipe like a closed one, so that it doesn't
+                    # take the other headless clients down with it.
+                    size = 0
+                if not size:
+                    self._selector.unregister(key.fileobj)
+                handler(buffer[:size])
+
+
+@lru_cache(maxsize=None)
+def _pipe_selector():
+    """Return the `_PipeSelector` shared by all `HeadlessProcess` instances."""
+    return _PipeSelector()
 
 
 class HeadlessProcess:
@@ -1203,6 +1364,23 @@ class HeadlessProcess:
     intended to be used directly. `HeadlessClient` should be used instead.
     """
 
+    # Unlike the client classes, this isn't meant to be subclassed or extended,
+    # so its attributes can be fixed.
+    __slots__ = (
+        "neos_dir",
+        "args",
+        "config",
+        "process",
+        "running",
+        "_stdin_lock",
+        "_stdout_queue",
+        "_stdout_lines",
+        "_stderr_lines",
+        "_stdout_buffer",
+        "_stderr_buffer",
+        "_threads",
+    )
+
     def __init__(self, neos_dir, config=None):
         self.neos_dir = neos_dir
 
@@ -1212,7 +1390,12 @@ class HeadlessProcess:
         # run using all default values without creating a configuration file.
         # For the former case, `config` is set to the absolute path of this
         # configuration file. For the latter, `config` is left at `None`.
-        self.args = ["mono", "Neos.exe"]  # TODO: Windows doesn't use Mono.
+        if sys.platform == "win32":
+            # Windows runs .NET executables natively. The path has to be
+            # absolute, since Windows doesn't look for executables in `cwd`.
+            self.args = [path.join(path.abspath(neos_dir), "Neos.exe")]
+        else:
+            self.args = ["mono", "Neos.exe"]
         if config:
             if not path.exists(config):
                 raise FileNotFoundError('Configuration file not found: "%s"' % config)
@@ -1235,15 +1418,67 @@ class HeadlessProcess:
         )
         self.running = True
 
-        self._stdin_queue = Queue()
-        self._stdout_queue = Queue()
-        self._stderr_queue = Queue()
+        if sys.platform.startswith("linux"):
+            # Pipes only hold 64 KiB by default, so Neos stalls on writing
+            # whenever the reader falls behind, ex. when the startup messages or
+            # a long `worlds` or `users` response come out in one burst. Ask for
+            # a larger stdout pipe. It's kept modest, since the pages of every
+            # pipe a user owns count against "/proc/sys/fs/pipe-user-pages-soft"
+            # and pipes past that limit are shrunk to a single page. stderr is
+            # barely used, so it keeps its default size.
+            import fcntl
 
-        self._threads = [
-            Thread(target=self._stdin_writer),
-            Thread(target=self._stdout_reader),
-            Thread(target=self._stderr_reader),
-        ]
+            try:
+                # `F_SETPIPE_SZ` is only defined by Python 3.10 and newer.
+                fcntl.fcntl(
+                    self.process.stdout.fileno(),
+                    getattr(fcntl, "F_SETPIPE_SZ", 1031),
+                    1 << 18,  # 256 KiB
+                )
+            except OSError:
+                # The pipe just keeps its default size.
+                pass
+
+        # Commands are written straight to stdin by whichever thread sends
+        # them, so writes have to be kept from interleaving.
+        self._stdin_lock = Lock()
+        # Nothing waits for the queue to be fully processed, so there's no need
+        # for the task tracking of a full `Queue`. Lines are queued in batches,
+        # one `list` for everything completed by a single read, so a long
+        # response is handed over in a few `put()`/`get()` pairs rather than
+        # one per line.
+        self._stdout_queue = SimpleQueue()
+        # Lines from the batch currently being read that haven't been returned
+        # yet.
+        self._stdout_lines = deque()
+        # Nothing consumes stderr, so only keep the most recent lines instead of
+        # letting a noisy client grow this without bound. They are kept as
+        # undecoded `bytes`, so no time is spent decoding output nobody reads.
+        self._stderr_lines = deque(maxlen=1000)
+        self._stdout_buffer = bytearray()
+        self._stderr_buffer = bytearray()
+
+        if sys.platform == "win32":
+            # `select()` only works on sockets on Windows, so each pipe needs
+            # its own blocking reader thread there.
+            self._threads = [
+                Thread(
+                    target=self._pipe_reader,
+                    args=(self.process.stdout, self._handle_stdout),
+                ),
+                Thread(
+                    target=self._pipe_reader,
+                    args=(self.process.stderr, self._handle_stderr),
+                ),
+            ]
+        else:
+            # The pipes of every headless client in this process are read by
+            # a single shared thread, so an RPC server running many of them
+            # doesn't need a thread for each.
+            selector = _pipe_selector()
+            selector.register(self.process.stdout, self._handle_stdout)
+            selector.register(self.process.stderr, self._handle_stderr)
+            self._threads = []
 
         for thread in self._threads:
             thread.daemon = True  # TODO: Does this need to be a daemon thread?
@@ -1251,19 +1486,57 @@ class HeadlessProcess:
 
     def write(self, data):
         """Write `data` to the process's stdin."""
-        self._stdin_queue.put(data)
+        # stdin is unbuffered, so this goes straight to the pipe.
+        with self._stdin_lock:
+            self.process.stdin.write(data.encode("utf8"))
 
     def readline(self, timeout=None):
         """
         Read a line from the process's stdout. Optionally wait up to `timeout`
         seconds and if there is no line to be read, raise `CommandTimeout`.
         """
-        try:
-            res = self._stdout_queue.get(timeout=timeout)
-            self._stdout_queue.task_done()
-        except Empty:
-            raise CommandTimeout("Command didn't complete within %d seconds" % timeout)
-        return res
+        pending = self._stdout_lines
+        if not pending:
+            try:
+                pending.extend(self._stdout_queue.get(timeout=timeout))
+            except Empty:
+                raise CommandTimeout(
+                    "Command didn't complete within %d seconds" % timeout
+                )
+        return pending.popleft()
+
+    def readlines_until_prompt(self, timeout=None):
+        """
+        Read lines from the process's stdout until the prompt is printed, and
+        return them as a `tuple` without the prompt. Optionally wait up to
+        `timeout` seconds for each line and if there is none, raise
+        `CommandTimeout`.
+        """
+        lines = []
+        pending = self._stdout_lines
+        get = self._stdout_queue.get
+        while True:
+            while pending:
+                ln = pending.popleft()
+                if ln.endswith(">"):
+                    return tuple(lines)
+                lines.append(ln)
+            try:
+                pending.extend(get(timeout=timeout))
+            except Empty:
+                raise CommandTimeout(
+                    "Command didn't complete within %d seconds" % timeout
+                )
+
+    def run_command(self, cmd, timeout=None):
+        """
+        Write `cmd` to the process's stdin as a line of its own, and return its
+        output as `readlines_until_prompt()` would. For a remote process, this
+        takes a single round trip instead of one for writing and another for
+        reading.
+        """
+        self.write(f"{cmd}\n")
+        return self.readlines_until_prompt(timeout=timeout)
 
     def shutdown(self, timeout=None, wait=True):
         """
@@ -1324,53 +1597,52 @@ class HeadlessProcess:
         """
         return self.process.wait(timeout=timeout)
 
-    def _stdin_writer(self):
-        while True:
-            try:
-                cmd = self._stdin_queue.get(timeout=0.5)
-            except Empty:
-                if self.running:
-                    continue
-                else:
-                    break
-            self.process.stdin.write(cmd.encode("utf8"))
-            self._stdin_queue.task_done()
-
-    def _stdout_reader(self):
-        line_buffer = ""
+    def _pipe_reader(self, pipe, handler):
+        """Read from `pipe` on the current thread until it is closed."""
+        buffer = memoryview(bytearray(65536))
         while True:
-            data = self.process.stdout.read(4096).decode("utf8")
-            if data == "":
-                # Stream has ended, trigger shutdown of other threads.
-                self.running = False
+            size = pipe.readinto(buffer)
+            handler(buffer[:size])
+            if not size:
                 break
-            lines = (line_buffer + data).split("\n")
-            line_buffer = ""
 
-            if lines[-1] == "":
-                lines.pop()
-            elif not lines[-1].endswith(">"):
-                line_buffer = lines.pop()
+    def _handle_stdout(self, data):
+        if not data:
+            # Stream has ended, so the process has exited.
+            self.running = False
+            return
+        line_buffer = self._stdout_buffer
+        line_buffer += data
+
+        # Only complete lines are decoded, so a multi-byte character that is
+        # split across two reads never gets decoded in halves. They are all
+        # decoded and split in one go, and dropped from the buffer together.
+        end = line_buffer.rfind(b"\n") + 1
+        if end:
+            batch = line_buffer[: end - 1].decode("utf8", "replace").split("\n")
+            del line_buffer[:end]
+        else:
+            batch = []
 
-            for ln in lines:
-                self._stdout_queue.put(ln)
+        # The prompt isn't followed by a newline, so pass it along as soon as
+        # it shows up.
+        if line_buffer.endswith(b">"):
+            batch.append(line_buffer.decode("utf8", "replace"))
+            line_buffer.clear()
 
-    def _stderr_reader(self):
-        line_buffer = ""
-        while True:
-            data = self.process.stderr.read(4096).decode("utf8")
-            if data == "":
-                break
-            lines = (line_buffer + data).split("\n")
-            line_buffer = ""
+        if batch:
+            self._stdout_queue.put(batch)
 
-            if lines[-1] == "":
-                lines.pop()
-            else:
-                line_buffer = lines.pop()
+    def _handle_stderr(self, data):
+        if not data:
+            return
+        line_buffer = self._stderr_buffer
+        line_buffer += data
 
-            for ln in lines:
-                self._stderr_queue.put(ln)
+        end = line_buffer.rfind(b"\n") + 1
+        if end:
+            self._stderr_lines.extend(bytes(line_buffer[: end - 1]).split(b"\n"))
+            del line_buffer[:end]
 
 
 class HeadlessCommand:
@@ -1378,28 +1650,38 @@ class HeadlessCommand:
     Represents a headless client command and its eventual corresponding output.
     This class may seem like a stripped down version of a "future", but its only
     purpose is to keep the output of a command tied to the command that produced
-    it, without having to maintain synced lists/queues for both input and
-    output. This is used internally in the command queue to ensure commands are
-    executing synchronously and in chronological order of submission. There is
-    no need to use it directly for anything.
-
-    If `world` is set, the command queue processing thread will try to focus or
-    "switch" to a different world immediately before executing the command. If
-    the specified world doesn't exist, the command will not execute.
+    it, so that callers waiting on an identical command can be handed the same
+    output. There is no need to use it directly for anything.
+
+    If `world` is set, the headless client will be asked to focus or "switch"
+    to a different world immediately before executing the command. If the
+    specified world doesn't exist, the command will not execute.
     """
 
+    # One of these is created for every command sent, so skip the per-instance
+    # `__dict__`.
+    __slots__ = ("cmd", "world", "_result", "_complete")
+
     def __init__(self, cmd, world=None):
         self.cmd = cmd
         self.world = world
         self._result = None
-        self._complete = Event()
+        # Held until the result is set. A bare lock is several times cheaper to
+        # create than an `Event`, and any number of waiters can still take
+        # turns acquiring and releasing it once it is free.
+        self._complete = Lock()
+        self._complete.acquire()
 
     def set_result(self, result):
         self._result = result
-        self._complete.set()
+        self._complete.release()
+
+    def done(self):
+        return not self._complete.locked()
 
     def result(self, timeout=None):
-        self._complete.wait(timeout=timeout)
+        if self._complete.acquire(timeout=-1 if timeout is None else timeout):
+            self._complete.release()
         return self._result
 
 
@@ -1453,11 +1735,11 @@ class HeadlessNotReady(Exception):
 
 
 __all__ = [
-    LocalHeadlessClient,
-    RemoteHeadlessClient,
-    HeadlessClient,
-    NeosError,
-    UnhandledError,
-    CommandTimeout,
-    HeadlessNotReady,
+    "LocalHeadlessClient",
+    "RemoteHeadlessClient",
+    "HeadlessClient",
+    "NeosError",
+    "UnhandledError",
+    "CommandTimeout",
+    "HeadlessNotReady",
 ]
@@ -0,0 +1,132 @@
+# NeosVR-Headless-API
+# Copyright (C) 2022  GlitchFur
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This file contains the functions that turn the output of commands into the
+# Python objects returned by `HeadlessClient`. They only depend on the lines of
+# output they are given, not on the state of any headless client.
+
+from re import Match
+
+# Roles and access levels only ever take a handful of values, so they are
+# interned to share one string object per value across every parsed record.
+from sys import intern
+
+from .response_formats import *
+
+
+def parse_worlds(lines):
+    """Parse the output of the "worlds" command into a `list` of `dict`."""
+    # World names can contain newline characters, so we have to put the whole
+    # command output back together and examine the whole thing.
+    output = "\n".join(lines)
+    return [
+        {
+            "name": name.rstrip(),
+            "users": int(users),
+            "present": int(present),
+            "access_level": intern(access_level),
+            "max_users": int(max_users),
+        }
+        for name, users, present, access_level, max_users in map(
+            Match.groups, WORLD_REGEX.finditer(output)
+        )
+    ]
+
+
+def parse_status(lines):
+    """
+    Parse the output of the "status" command into a `dict`. Returns `None` if
+    the output isn't recognized.
+    """
+    # Any errors printed to the console before the status itself are skipped
+    # over, since the name is only matched from the "Name:" line. This is a Neos
+    # bug. See: https://github.com/Neos-Metaverse/NeosPublic/issues/2436
+    # Known bug: World names with any line ending with a ">" character should
+    # be avoided, as this interferes with prompt detection.
+    output = "\n".join(lines)
+    name = STATUS_NAME_REGEX.search(output)
+    description = STATUS_DESCRIPTION_REGEX.search(output)
+    if name is None or description is None:
+        return None
+    # A multi-line name or description could contain lines that look like other
+    # fields, so anything matched inside of them is ignored, and the first match
+    # of a field wins, the same as the lazy description match.
+    name_start, name_end = name.span("name")
+    desc_start, desc_end = description.span("description")
+    fields = {}
+    for match in STATUS_FIELD_REGEX.finditer(output):
+        start = match.start()
+        if not (name_start <= start < name_end or desc_start <= start < desc_end):
+            fields.setdefault(match.lastgroup, match[match.lastgroup])
+    if len(fields) < len(STATUS_FIELD_REGEX.groupindex):
+        return None
+    tags = fields["tags"]
+    users = fields["users"]
+    return {
+        # The name and description are `None` if they are empty.
+        "name": name["name"] or None,
+        "session_id": fields["session_id"],
+        "current_users": int(fields["current_users"]),
+        "present_users": int(fields["present_users"]),
+        "max_users": int(fields["max_users"]),
+        "uptime": fields["uptime"],
+        "access_level": intern(fields["access_level"]),
+        "hidden_from_listing": fields["hidden_from_listing"] == "True",
+        "mobile_friendly": fields["mobile_friendly"] == "True",
+        "description": description["description"] or None,
+        "tags": tags.split(", ") if tags else [],
+        "users": users.split(", ") if users else [],
+    }
+
+
+def parse_users(lines):
+    """Parse the output of the "users" command into a `list` of `dict`."""
+    # Lines that don't match are invalid output and are skipped.
+    return [
+        _user_from_match(user)
+        for user in map(USER_REGEX.fullmatch, lines)
+        if user is not None
+    ]
+
+
+def _user_from_match(user):
+    """Convert a match of `USER_REGEX` to a user `dict`."""
+    # Unpacking all groups at once is cheaper than looking each one up by name.
+    name, user_id, role, present, ping, fps, silenced = user.groups()
+    # Check if a user has a user ID and set it to `None` if they don't. This
+    # should only happen for the headless user if it is not logged into a Neos
+    # account.
+    user_id = user_id.lstrip()
+    fps = float(fps)
+    return {
+        "name": name,
+        "user_id": user_id if user_id != "" else None,
+        "role": intern(role),
+        "present": present == "True",
+        "ping": int(ping),
+        "fps": int(fps) if fps.is_integer() else fps,
+        "silenced": silenced == "True",
+    }
+
+
+def parse_bans(lines):
+    """Parse the output of the "listbans" command into a `list` of `dict`."""
+    # Lines that don't match are invalid output and are skipped.
+    return [
+        banned.groupdict()
+        for banned in map(BAN_REGEX.fullmatch, lines)
+        if banned is not None
+    ]
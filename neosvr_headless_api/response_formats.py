@@ -14,14 +14,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-# This file contains format strings that describe how the output of the various
-# commands in the headless client should be parsed. If the NeosVR developers
-# change the format of any command's response, this file can be easily updated
-# so that NeosVR-Headless-API can continue to parse responses properly.
+# This file contains format strings and patterns that describe how the output
+# of the various commands in the headless client should be parsed. If the
+# NeosVR developers change the format of any command's response, this file can
+# be easily updated so that NeosVR-Headless-API can continue to parse responses
+# properly.
 
-# For more information on how to write these strings, please see:
-# https://github.com/r1chardj0n3s/parse
-# https://docs.python.org/3/library/string.html#format-string-syntax
+# The startup messages are described with simple format strings, where "{}"
+# marks the value that is captured. Everything else is described with regular
+# expressions, see:
+# https://docs.python.org/3/library/re.html#regular-expression-syntax
+
+# Everything is compiled here once at import time, so that callers never have
+# to compile a format or pattern themselves.
+
+import re
 
 # These are for parsing all the startup messages that come BEFORE the prompt.
 NEOS_VERSION_FORMAT = "Initializing Neos: {}"
@@ -31,32 +38,72 @@ ARGUMENT_FORMAT = "Argument: {}"
 COMPATIBILITY_HASH_FORMAT = "Compatibility Hash: {}"
 MACHINE_ID_FORMAT = "MachineID: {}"
 SUPPORTED_NETWORK_PROTOCOLS_FORMAT = "Supported network protocols: {}"
+# All of the startup messages above combined into one pattern, so that each
+# startup line only has to be matched once. Each message is captured by a group
+# named after the `HeadlessClient` attribute it is stored in. This relies on
+# every startup format being a fixed prefix followed by a single "{}" field.
+STARTUP_REGEX = re.compile(
+    "|".join(
+        re.escape(fmt.partition("{}")[0]) + f"(?P<{attr}>.+)"
+        for fmt, attr in (
+            (NEOS_VERSION_FORMAT, "version"),
+            (SUPPORTED_TEXTURE_FORMATS_FORMAT, "supported_texture_formats"),
+            (AVAILABLE_LOCALES_FORMAT, "available_locales"),
+            (ARGUMENT_FORMAT, "argument"),
+            (COMPATIBILITY_HASH_FORMAT, "compatibility_hash"),
+            (MACHINE_ID_FORMAT, "machine_id"),
+            (SUPPORTED_NETWORK_PROTOCOLS_FORMAT, "supported_network_protocols"),
+        )
+    )
+)
 
-WORLD_FORMAT = "[{:d}] {name}Users: {users:d}\tPresent: {present:d}\tAccessLevel: {access_level}\tMaxUsers: {max_users:d}"
-# Note the lack of space between "ID:" and "{user_id}" in the format string
+# World names can contain newline characters, so this is matched against the
+# whole output of the command rather than line by line.
+WORLD_REGEX = re.compile(
+    r"\[\d+\] (?P<name>.+?)Users: (?P<users>\d+)\tPresent: (?P<present>\d+)"
+    r"\tAccessLevel: (?P<access_level>.+?)\tMaxUsers: (?P<max_users>\d+)",
+    re.DOTALL,
+)
+# Note the lack of space between "ID:" and the "user_id" group in the pattern
 # below. This is intentional. If the headless user is not logged into a Neos
-# account, the ID field will be blank. In this case, "{user_id}" will catch the
+# account, the ID field will be blank. In this case, "user_id" will catch the
 # single space character, which we can then interpret as no ID. If we left the
-# space in the format string, then `parse()` would fail entirely. This also
-# means in all other cases, valid IDs will have an extra space before them, but
-# that can be easily trimmed off.
-USER_FORMAT = "{name}\tID:{user_id}\tRole: {role}\tPresent: {present}\tPing: {ping:d} ms\tFPS: {fps:g}\tSilenced: {silenced}"
-BAN_FORMAT = "[{:d}]\tUsername: {name}\tUserID: {user_id}\tMachineId: {machine_id}"
-
-# STATUS_NAME_FORMAT and STATUS_DESCRIPTION_FORMAT contain "SessionID:" and
-# "Tags:" at the end of their format strings respectively because it allows for
-# parsing world names and descriptions that contain newline characters. By
-# "reading into" the next line of the output like this, we can detect the true
-# end of those values.
-STATUS_NAME_FORMAT = "Name: {}\nSessionID:{}"
-STATUS_SESSION_ID_FORMAT = "SessionID: {}"
-STATUS_CURRENT_USERS_FORMAT = "Current Users: {:d}"
-STATUS_PRESENT_USERS_FORMAT = "Present Users: {:d}"
-STATUS_MAX_USERS_FORMAT = "Max Users: {:d}"
-STATUS_UPTIME_FORMAT = "Uptime: {}"
-STATUS_ACCESS_LEVEL_FORMAT = "Access Level: {}"
-STATUS_HIDDEN_FROM_LISTING_FORMAT = "Hidden from listing: {}"
-STATUS_MOBILE_FRIENDLY_FORMAT = "Mobile Friendly: {}"
-STATUS_DESCRIPTION_FORMAT = "Description: {}\nTags:{}"
-STATUS_TAGS_FORMAT = "Tags: {}"
-STATUS_USERS_FORMAT = "Users: {}"
+# space in the pattern, then matching would fail entirely. This also means in
+# all other cases, valid IDs will have an extra space before them, but that can
+# be easily trimmed off.
+USER_REGEX = re.compile(
+    r"(?P<name>.+?)\tID:(?P<user_id>.+?)\tRole: (?P<role>.+?)"
+    r"\tPresent: (?P<present>.+?)\tPing: (?P<ping>-?\d+) ms"
+    r"\tFPS: (?P<fps>[-+]?(?:\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|NaN|Infinity))"
+    r"\tSilenced: (?P<silenced>.+)"
+)
+BAN_REGEX = re.compile(
+    r"\[\d+\]\tUsername: (?P<name>.+?)\tUserID: (?P<user_id>.+?)"
+    r"\tMachineId: (?P<machine_id>.+)"
+)
+
+# The name and description of a world can contain newline characters. They are
+# matched lazily up to the "SessionID:" and "Tags:" lines that follow them,
+# which marks the true end of those values.
+STATUS_NAME_REGEX = re.compile(
+    r"^Name: (?P<name>.*?)\nSessionID:", re.DOTALL | re.MULTILINE
+)
+STATUS_DESCRIPTION_REGEX = re.compile(
+    r"^Description: (?P<description>.*?)\nTags:", re.DOTALL | re.MULTILINE
+)
+# Every other field is a single line, and each of them is matched on its own, so
+# that log messages printed in between them are skipped over. Trailing
+# whitespace is left out of every value.
+STATUS_FIELD_REGEX = re.compile(
+    r"^(?:SessionID: (?P<session_id>.*?)"
+    r"|Current Users: (?P<current_users>\d+)"
+    r"|Present Users: (?P<present_users>\d+)"
+    r"|Max Users: (?P<max_users>\d+)"
+    r"|Uptime: (?P<uptime>.*?)"
+    r"|Access Level: (?P<access_level>.*?)"
+    r"|Hidden from listing: (?P<hidden_from_listing>.*?)"
+    r"|Mobile Friendly: (?P<mobile_friendly>.*?)"
+    r"|Tags: (?P<tags>.*?)"
+    r"|Users: (?P<users>.*?))[ \t]*$",
+    re.MULTILINE,
+)
@@ -63,11 +63,11 @@ class HeadlessProcessService(Service):
 
     def on_connect(self, conn):
         host, port = conn._config["endpoints"][1]
-        logging.info("Client connected from %s:%d" % (host, port))
+        logging.info("Client connected from %s:%d", host, port)
 
     def on_disconnect(self, conn):
         host, port = conn._config["endpoints"][1]
-        logging.info("Client disconnected from %s:%d" % (host, port))
+        logging.info("Client disconnected from %s:%d", host, port)
 
     def exposed_start_headless_process(self, *args, **kwargs):
         """
@@ -83,6 +83,7 @@ class HeadlessProcessService(Service):
             "config",
             "write",
             "readline",
+            "run_command",
             "shutdown",
             "sigint",
             "terminate",
@@ -92,10 +93,10 @@ class HeadlessProcessService(Service):
         process = restricted(HeadlessProcess(*args, **kwargs), allowed_access)
         self.current_id += 1
         self.processes[self.current_id] = process
-        logging.info("Starting headless process with ID: %d" % self.current_id)
-        logging.info("Neos Dir: %s" % process.neos_dir)
-        logging.info("Config: %s" % process.config)
-        logging.info("Total processes running: %d" % len(self.processes))
+        logging.info("Starting headless process with ID: %d", self.current_id)
+        logging.info("Neos Dir: %s", process.neos_dir)
+        logging.info("Config: %s", process.config)
+        logging.info("Total processes running: %d", len(self.processes))
         return (self.current_id, process)
 
     def exposed_stop_headless_process(self, pid):
@@ -107,10 +108,11 @@ class HeadlessProcessService(Service):
         exit_code = process.shutdown()
         del self.processes[pid]
         logging.info(
-            "Headless process with ID %d terminated with return code %d."
-            % (pid, exit_code)
+            "Headless process with ID %d terminated with return code %d.",
+            pid,
+            exit_code,
         )
-        logging.info("Total processes running: %d" % len(self.processes))
+        logging.info("Total processes running: %d", len(self.processes))
         return exit_code
 
     def exposed_send_signal_headless_process(self, pid, sig):
@@ -135,10 +137,11 @@ class HeadlessProcessService(Service):
         # `exposed_stop_headless_process()`
         del self.processes[pid]
         logging.info(
-            "Headless process with ID %d terminated with return code %d."
-            % (pid, exit_code)
+            "Headless process with ID %d terminated with return code %d.",
+            pid,
+            exit_code,
         )
-        logging.info("Total processes running: %d" % len(self.processes))
+        logging.info("Total processes running: %d", len(self.processes))
         return exit_code
 
     def exposed_get_headless_process(self, pid):